@@ -6,15 +6,16 @@ Provides REST endpoints for querying EU legislation and analyzing overlaps/contr
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 import sys
 import os
 import re
 
 # Add parent directory to path to import rag_search
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from rag_search import EULegislationRAG
+from rag_singleton import get_rag
 from cache_db import ResponseCache
 
 # Configuration
@@ -43,6 +44,25 @@ if not METADATA_FILE:
     print(f"Searched paths: {METADATA_PATHS}")
     METADATA_FILE = "metadata_store_production.pkl"  # Use default, will fail gracefully
 
+# Extra labelled lines the LLM sometimes adds to list items, removed in one pass
+EXTRA_LABEL_PATTERN = re.compile(
+    r'(?:Quote|Explanation|Severity|Practical Impact):.*?(?=\n|$)',
+    re.IGNORECASE
+)
+
+# Valid section header lines in plain-text LLM analysis (e.g. "OVERLAPS:")
+SECTION_HEADER_PATTERN = re.compile(
+    r'^[^\S\n]*(SUMMARY|OVERLAPS):*[^\S\n]*$',
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Numbered list items in plain-text LLM analysis ("1. ...")
+NUMBERED_ITEM_PATTERN = re.compile(r'^\d+\.\s+')
+ITEM_SPLIT_PATTERN = re.compile(r'\n\s*(\d+)\.\s+')
+
+# "Reg A Article X vs Reg B Article Y - description"
+REGULATION_PAIR_PATTERN = re.compile(r'^(.+?)\s+vs\s+(.+?)\s*[-–—]\s*(.+)$', re.DOTALL)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="EU Legislation RAG API",
@@ -61,9 +81,12 @@ app.add_middleware(
     max_age=3600,
 )
 
+# Compress responses - regulation lists carry full chunk text and shrink several-fold
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Initialize RAG system
 print("Initializing RAG system...")
-rag = EULegislationRAG(
+rag = get_rag(
     project_id=PROJECT_ID,
     location=LOCATION,
     index_endpoint_name=INDEX_ENDPOINT_NAME,
@@ -270,12 +293,12 @@ async def get_regulations(request: RegulationRequest):
 
 
 
-def parse_llm_analysis(llm_text: str) -> Tuple[List[OverlapResponse], List[ContradictionResponse]]:
+def parse_llm_analysis(llm_text: Union[Dict, str]) -> Tuple[List[OverlapResponse], List[ContradictionResponse]]:
     """
-    Parse LLM analysis text to extract overlaps (contradictions are treated as overlaps).
+    Parse LLM analysis to extract overlaps (contradictions are treated as overlaps).
     
     Args:
-        llm_text: LLM analysis text with sections
+        llm_text: Structured LLM analysis dict, or LLM analysis text with sections
         
     Returns:
         Tuple of (overlaps, empty list for contradictions)
@@ -287,32 +310,23 @@ def parse_llm_analysis(llm_text: str) -> Tuple[List[OverlapResponse], List[Contr
         print("No LLM text to parse")
         return overlaps, contradictions
     
-    # Split into sections - only look for OVERLAPS
-    VALID_SECTIONS = {'SUMMARY', 'OVERLAPS'}
+    # Structured (JSON schema) output - no section scraping needed
+    if isinstance(llm_text, dict):
+        overlaps = parse_overlaps_json(llm_text.get('overlaps', []))
+        print(f"Found {len(overlaps)} overlaps")
+        return overlaps, contradictions
     
+    # Split into sections - only look for OVERLAPS
+    # One regex scan finds every header line; sections are sliced between them
     sections = {}
-    current_section = None
-    current_content = []
-    
-    for line in llm_text.split('\n'):
-        line_stripped = line.strip()
-        
-        # Check if line is a valid section header (all caps, short, matches our sections)
-        line_upper = line_stripped.upper().rstrip(':')
-        
-        if line_upper in VALID_SECTIONS and len(line_stripped) < 50:
-            # Found a valid section header
-            if current_section:
-                sections[current_section] = '\n'.join(current_content)
-            current_section = line_upper
-            current_content = []
-            print(f"Found section: {line_upper}")
-        else:
-            current_content.append(line)
+    headers = list(SECTION_HEADER_PATTERN.finditer(llm_text))
     
-    # Add last section
-    if current_section:
-        sections[current_section] = '\n'.join(current_content)
+    for i, header in enumerate(headers):
+        section = header.group(1).upper()
+        print(f"Found section: {section}")
+        start = header.end() + 1
+        end = headers[i + 1].start() - 1 if i + 1 < len(headers) else len(llm_text)
+        sections[section] = llm_text[start:end]
     
     print(f"Parsed sections: {list(sections.keys())}")
     
@@ -327,6 +341,80 @@ def parse_llm_analysis(llm_text: str) -> Tuple[List[OverlapResponse], List[Contr
     return overlaps, contradictions
 
 
+def parse_overlaps_json(items: List[Dict]) -> List[OverlapResponse]:
+    """Build overlaps from structured LLM output items.
+    
+    Expected format:
+    {"regulation1": "...", "regulation2": "...", "description": "..."}
+    """
+    overlaps = []
+    
+    for idx, item in enumerate(items, 1):
+        # Fields may be JSON null or non-strings
+        reg1 = str(item.get('regulation1') or '').replace('**', '').strip()
+        reg2 = str(item.get('regulation2') or '').replace('**', '').strip()
+        description = str(item.get('description') or '').replace('**', '').strip().rstrip('.').strip()
+        
+        if not reg1 or not reg2 or len(description) < 10:
+            print(f"  ✗ Skipped overlap #{idx}: incomplete item")
+            continue
+        
+        overlaps.append(OverlapResponse(
+            id=f"overlap-{idx}",
+            regulationPair=(reg1, reg2),
+            type="Complementary",  # Default, frontend can categorize if needed
+            description=description,
+            confidenceScore=0.85,
+            excerpts={"regulation1": "", "regulation2": ""}
+        ))
+        print(f"  ✓ Parsed overlap: {reg1} vs {reg2}")
+    
+    return overlaps
+
+
+def extract_regulation_pairs(items: List[str], kind: str) -> List[Tuple[str, str, str, str]]:
+    """Extract regulation pairs from numbered list items.
+    
+    Args:
+        items: ITEM_SPLIT_PATTERN.split() output - [preamble, number, content, number, content, ...]
+        kind: Item kind used in log messages ("overlap" or "contradiction")
+        
+    Returns:
+        List of (number, regulation1, regulation2, description) tuples
+    """
+    pairs = []
+    
+    # Items come in pairs: [number, content, number, content, ...]
+    for i in range(1, len(items) - 1, 2):
+        idx = items[i]
+        item = items[i + 1].strip()
+        
+        print(f"\n  Processing {kind} #{idx}:")
+        print(f"    First 200 chars: {item[:200]}")
+        
+        if not item or len(item) < 10:
+            print(f"    ✗ Skipped: too short")
+            continue
+        
+        # Extract regulation pair: "Reg A Article X vs Reg B Article Y"
+        # Look for pattern: text vs text - description
+        pair_match = REGULATION_PAIR_PATTERN.search(item)
+        
+        if not pair_match:
+            print(f"    ✗ Could not parse {kind} format (no 'vs' pattern found)")
+            continue
+        
+        reg1 = pair_match.group(1).strip()
+        reg2 = pair_match.group(2).strip()
+        
+        # Remove trailing period and clean up
+        description = pair_match.group(3).strip().rstrip('.').strip()
+        
+        pairs.append((idx, reg1, reg2, description))
+    
+    return pairs
+
+
 def parse_overlaps(text: str) -> List[OverlapResponse]:
     """Parse overlaps from text section.
     
@@ -340,11 +428,8 @@ def parse_overlaps(text: str) -> List[OverlapResponse]:
         return overlaps
     
     # Clean up text - remove bold formatting and extra keywords
-    text = re.sub(r'\*\*', '', text)  # Remove ** bold markers
-    text = re.sub(r'Quote:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Quote: sections
-    text = re.sub(r'Explanation:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Explanation: sections
-    text = re.sub(r'Severity:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Severity: sections
-    text = re.sub(r'Practical Impact:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Practical Impact: sections
+    text = text.replace('**', '')  # Remove ** bold markers
+    text = EXTRA_LABEL_PATTERN.sub('', text)  # Remove Quote:/Explanation:/Severity:/Practical Impact: sections
     
     # Join lines that don't start with a number - this handles multi-line items
     lines = text.split('\n')
@@ -354,7 +439,7 @@ def parse_overlaps(text: str) -> List[OverlapResponse]:
     for line in lines:
         line = line.strip()
         # Check if line starts with a number followed by period (new item)
-        if re.match(r'^\d+\.\s+', line):
+        if NUMBERED_ITEM_PATTERN.match(line):
             if current_item:
                 joined_lines.append(current_item)
             current_item = line
@@ -376,57 +461,21 @@ def parse_overlaps(text: str) -> List[OverlapResponse]:
     print("="*80)
     
     # Split by numbered items (1., 2., etc.) at start of line
-    items = re.split(r'\n\s*(\d+)\.\s+', text)
+    items = ITEM_SPLIT_PATTERN.split(text)
     print(f"Split into {len(items)} parts")
     for idx, part in enumerate(items):
         print(f"  Part {idx}: {part[:100]}")
     
-    # Items come in pairs: [number, content, number, content, ...]
-    for i in range(1, len(items), 2):
-        if i + 1 >= len(items):
-            break
-            
-        idx = items[i]
-        item = items[i + 1].strip()
-        
-        print(f"\n  Processing overlap #{idx}:")
-        print(f"    First 200 chars: {item[:200]}")
-        
-        if not item or len(item) < 10:
-            print(f"    ✗ Skipped: too short")
-            continue
-        
-        try:
-            # Extract regulation pair: "Reg A Article X vs Reg B Article Y"
-            # Look for pattern: text vs text - description
-            pair_match = re.search(r'^(.+?)\s+vs\s+(.+?)\s*[-–—]\s*(.+)$', item, re.DOTALL)
-            
-            if not pair_match:
-                print(f"    ✗ Could not parse overlap format (no 'vs' pattern found)")
-                continue
-            
-            reg1 = pair_match.group(1).strip()
-            reg2 = pair_match.group(2).strip()
-            description = pair_match.group(3).strip()
-            
-            # Remove trailing period and clean up
-            description = description.rstrip('.').strip()
-            
-            overlap = OverlapResponse(
-                id=f"overlap-{idx}",
-                regulationPair=(reg1, reg2),
-                type="Complementary",  # Default, frontend can categorize if needed
-                description=description,
-                confidenceScore=0.85,
-                excerpts={"regulation1": "", "regulation2": ""}
-            )
-            overlaps.append(overlap)
-            print(f"  ✓ Parsed overlap: {reg1} vs {reg2}")
-            
-        except Exception as e:
-            print(f"  ✗ Error parsing overlap: {e}")
-            print(f"    Item: {item[:150]}")
-            continue
+    for idx, reg1, reg2, description in extract_regulation_pairs(items, "overlap"):
+        overlaps.append(OverlapResponse(
+            id=f"overlap-{idx}",
+            regulationPair=(reg1, reg2),
+            type="Complementary",  # Default, frontend can categorize if needed
+            description=description,
+            confidenceScore=0.85,
+            excerpts={"regulation1": "", "regulation2": ""}
+        ))
+        print(f"  ✓ Parsed overlap: {reg1} vs {reg2}")
     
     return overlaps
 
@@ -444,56 +493,21 @@ def parse_contradictions(text: str) -> List[ContradictionResponse]:
         return contradictions
     
     # Clean up text - remove bold formatting and extra keywords
-    text = re.sub(r'\*\*', '', text)  # Remove ** bold markers
-    text = re.sub(r'Quote:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Quote: sections
-    text = re.sub(r'Explanation:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Explanation: sections
-    text = re.sub(r'Severity:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Severity: sections
-    text = re.sub(r'Practical Impact:.*?(?=\n|$)', '', text, flags=re.IGNORECASE)  # Remove Practical Impact: sections
+    text = text.replace('**', '')  # Remove ** bold markers
+    text = EXTRA_LABEL_PATTERN.sub('', text)  # Remove Quote:/Explanation:/Severity:/Practical Impact: sections
     
     # Split by numbered items (1., 2., etc.) at start of line
-    items = re.split(r'\n\s*(\d+)\.\s+', text)
-    
-    # Items come in pairs: [number, content, number, content, ...]
-    for i in range(1, len(items), 2):
-        if i + 1 >= len(items):
-            break
-            
-        idx = items[i]
-        item = items[i + 1].strip()
-        
-        if not item or len(item) < 10:
-            continue
-        
-        try:
-            # Extract regulation pair: "Reg A Article X vs Reg B Article Y"
-            # Look for pattern: text vs text - description
-            pair_match = re.search(r'^(.+?)\s+vs\s+(.+?)\s*[-–—]\s*(.+)$', item, re.DOTALL)
-            
-            if not pair_match:
-                print(f"  Could not parse contradiction format: {item[:100]}")
-                continue
-            
-            reg1 = pair_match.group(1).strip()
-            reg2 = pair_match.group(2).strip()
-            description = pair_match.group(3).strip()
-            
-            # Remove trailing period and clean up
-            description = description.rstrip('.').strip()
-            
-            contradiction = ContradictionResponse(
-                id=f"contradiction-{idx}",
-                regulationPair=(reg1, reg2),
-                description=description,
-                severity="Medium",  # Default, frontend can display differently if needed
-                conflictingRequirements={"regulation1": "", "regulation2": ""}
-            )
-            contradictions.append(contradiction)
-            print(f"  ✓ Parsed contradiction: {reg1} vs {reg2}")
-            
-        except Exception as e:
-            print(f"  ✗ Error parsing contradiction: {e}")
-            print(f"    Item: {item[:150]}")
-            continue
+    items = ITEM_SPLIT_PATTERN.split(text)
+    
+    for idx, reg1, reg2, description in extract_regulation_pairs(items, "contradiction"):
+        contradictions.append(ContradictionResponse(
+            id=f"contradiction-{idx}",
+            regulationPair=(reg1, reg2),
+            description=description,
+            severity="Medium",  # Default, frontend can display differently if needed
+            conflictingRequirements={"regulation1": "", "regulation2": ""}
+        ))
+        print(f"  ✓ Parsed contradiction: {reg1} vs {reg2}")
     
     return contradictions
 
@@ -538,7 +552,7 @@ async def analyze_regulations(request: AnalysisRequest):
         # Parse LLM analysis
         llm_analysis = result.get('llm_analysis', '')
         raw_analysis = result.get('raw_analysis', '')
-        print(f"Raw LLM Analysis (first 500 chars):\n{llm_analysis[:500]}")
+        print(f"Raw LLM Analysis (first 500 chars):\n{str(llm_analysis)[:500]}")
         overlaps, contradictions = parse_llm_analysis(llm_analysis)
         
         # Convert to dict for caching (use model_dump instead of deprecated dict)
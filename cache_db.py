@@ -154,7 +154,7 @@ class ResponseCache:
             (query_hash, subcategory_id, subcategory_description, top_k, regulations_json)
             VALUES (?, ?, ?, ?, ?)
         """, (query_hash, subcategory_id, subcategory_description, top_k, 
-              json.dumps(regulations)))
+              json.dumps(regulations, separators=(',', ':'))))
         
         conn.commit()
         conn.close()
@@ -225,7 +225,8 @@ class ResponseCache:
              overlaps_json, contradictions_json)
             VALUES (?, ?, ?, ?, ?, ?)
         """, (query_hash, subcategory_id, subcategory_description, top_k,
-              json.dumps(overlaps), json.dumps(contradictions)))
+              json.dumps(overlaps, separators=(',', ':')),
+              json.dumps(contradictions, separators=(',', ':'))))
         
         conn.commit()
         conn.close()
@@ -432,7 +432,7 @@ class EmbeddingGenerator:
         # Show progress for JSON serialization
         content_lines = []
         for emb in tqdm(embeddings, desc="  Serializing", leave=False, unit="emb"):
-            content_lines.append(json.dumps(emb))
+            content_lines.append(json.dumps(emb, separators=(',', ':')))
         content = "\n".join(content_lines)
         
         # Upload to GCS
@@ -340,7 +340,7 @@ class EmbeddingGenerator:
         # Show progress for JSON serialization
         content_lines = []
         for emb in tqdm(embeddings, desc=f"  W{self.task_index} Serializing", leave=False, unit="emb", position=self.task_index * 2 + 1):
-            content_lines.append(json.dumps(emb))
+            content_lines.append(json.dumps(emb, separators=(',', ':')))
         content = "\n".join(content_lines)
         
         # Upload to GCS
@@ -257,6 +257,22 @@ class MetadataExtractor:
         re.IGNORECASE
     )
     
+    # Fallback document type keywords per source type, checked in order
+    DOC_TYPE_KEYWORDS = {
+        'international_standard': (
+            ('framework', 'Framework'),
+            ('standard', 'Standard'),
+            ('guideline', 'Guideline'),
+            ('directive', 'Directive'),
+            ('regulation', 'Regulation'),
+        ),
+        'national_law': (
+            ('laki', 'Act'),
+            ('act', 'Act'),
+            ('asetus', 'Decree'),
+        ),
+    }
+    
     # Enhanced reference pattern
     REF_PATTERN = re.compile(
         r'\((EU|EC|EEC)\)\s+(?:No\s+)?(\d{4}/\d+|\d+/\d{4})',
@@ -280,18 +296,16 @@ class MetadataExtractor:
                     if len(line) < 10 and '(' in line and line[0].isdigit():
                         continue
                     
-                    # Skip translation notes
-                    if 'translation from' in line.lower() or 'legally binding' in line.lower():
-                        continue
-                    
-                    # Skip ministry attribution
-                    if 'ministry of' in line.lower():
+                    # Skip translation notes and ministry attribution
+                    line_lower = line.lower()
+                    if ('translation from' in line_lower or 'legally binding' in line_lower
+                            or 'ministry of' in line_lower):
                         continue
                     
                     # Look for "Act on..." or "Laki..." - the actual title
                     if ('Act on' in line or 'Laki' in line) and len(line) > 20:
                         # Clean up - remove extra info after parentheses
-                        if '(' in line and line.count('(') > 1:
+                        if line.count('(') > 1:
                             # Keep everything up to and including the first closing paren
                             match = re.search(r'^(.+?\)\s*(?:\(.+?\))?)', line)
                             if match:
@@ -361,19 +375,11 @@ class MetadataExtractor:
                 doc_type = doc_type.replace('Laki', 'Act')
             return doc_type
         
-        # Check for international standards
-        if source_type == 'international_standard':
-            for keyword in ['Framework', 'Standard', 'Guideline', 'Directive', 'Regulation']:
-                if keyword.lower() in first_paragraph[:500].lower():
-                    return keyword
-        
-        # Check for Finnish specific document types
-        if source_type == 'national_law':
+        # Check keyword rules for international standards / Finnish document types
+        rules = MetadataExtractor.DOC_TYPE_KEYWORDS.get(source_type)
+        if rules:
             search_lower = first_paragraph[:500].lower()
-            if 'laki' in search_lower or 'act' in search_lower:
-                return 'Act'
-            if 'asetus' in search_lower:
-                return 'Decree'
+            return next((label for keyword, label in rules if keyword in search_lower), "Unknown")
         
         return "Unknown"
     
@@ -980,19 +986,16 @@ class LocalFileWriter:
         for batch_idx in range(0, len(chunks), batch_size):
             batch = chunks[batch_idx:batch_idx + batch_size]
             
-            # Create JSONL content
-            jsonl_lines = []
-            for chunk in batch:
-                jsonl_lines.append(json.dumps(asdict(chunk), ensure_ascii=False))
-            
-            jsonl_content = "\n".join(jsonl_lines)
-            
             # Write to local file with global counter
             filename = f"chunks_batch_{self.file_counter:06d}.jsonl"
             file_path = self.output_dir / filename
             
+            # Write JSONL records one at a time (no intermediate batch string)
             with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(jsonl_content)
+                for i, chunk in enumerate(batch):
+                    if i:
+                        f.write("\n")
+                    f.write(json.dumps(asdict(chunk), ensure_ascii=False, separators=(',', ':')))
             
             written_files.append(file_path)
             self.logger.info(f"Written batch file {self.file_counter}: {filename} ({len(batch)} chunks)")
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Debug the /api/analyze endpoint with a couple of real subcategory requests
+Requires the debug dependencies: pip install -r requirements_dev.txt
+"""
+import asyncio
+import os
+import sys
+import httpx
+import orjson
+
+# Configuration
+API_URL = os.getenv("API_URL", "http://localhost:8000")
+ANALYZE_URL = f"{API_URL}/api/analyze"
+TIMEOUT = 300
+MAX_RETRIES = 5
+RETRY_STATUSES = {502, 503, 504}  # Cloud Run cold starts / overload
+
+ANALYSIS_REQUESTS = [
+    {
+        "subcategory_id": "1.1",
+        "subcategory_description": "Capital requirements and own funds for credit institutions",
+        "top_k": 30,
+    },
+    {
+        "subcategory_id": "2.1",
+        "subcategory_description": "Customer due diligence for anti-money laundering",
+        "top_k": 20,
+    },
+]
+
+
+async def _post_with_retry(client: httpx.AsyncClient, payload: dict) -> httpx.Response:
+    """POST to the analyze endpoint with exponential backoff on transient 5xx.
+
+    Args:
+        client: Shared HTTP client
+        payload: Analysis request body
+
+    Returns:
+        Final response (may still be an error after the last retry)
+    """
+    for attempt in range(MAX_RETRIES):
+        response = await client.post(ANALYZE_URL, json=payload)
+        if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES - 1:
+            return response
+        wait_time = 0.5 * (2 ** attempt)  # Exponential backoff
+        print(f"  {payload['subcategory_id']}: HTTP {response.status_code}, "
+              f"waiting {wait_time:.1f}s before retry {attempt + 1}/{MAX_RETRIES}...")
+        await asyncio.sleep(wait_time)
+
+
+def _dump(body):
+    """Write a response body to stdout.
+
+    Pretty-printed for an interactive terminal, one compact NDJSON line otherwise
+    (e.g. CI logs). Bytes go straight to the stdout buffer when there is one,
+    skipping str encoding; replaced streams (e.g. pytest capture) get text.
+    """
+    option = orjson.OPT_INDENT_2 if sys.stdout.isatty() else 0
+    data = orjson.dumps(body, option=option) + b"\n"
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None:
+        sys.stdout.write(data.decode())
+        return
+    sys.stdout.flush()
+    buffer.write(data)
+    buffer.flush()
+
+
+async def _analyze(client: httpx.AsyncClient, payload: dict):
+    """POST one analysis request and decode its JSON body.
+
+    Failures are returned instead of raised, so one bad request does not end
+    the run while the others are still in flight.
+
+    Returns:
+        (payload, response, body) - response is None if the request itself
+        failed; body is the decoded JSON, or the raw text / error message
+    """
+    try:
+        response = await _post_with_retry(client, payload)
+    except httpx.HTTPError as e:
+        return payload, None, f"Request failed: {e!r}"
+
+    # Cloud Run 5xx pages are HTML/text, only decode actual JSON bodies
+    if response.headers.get("content-type", "").startswith("application/json"):
+        try:
+            return payload, response, orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            pass
+    return payload, response, response.text
+
+
+async def main():
+    """Run the analysis requests concurrently and dump each response as it arrives."""
+    # One pooled HTTP/2 connection multiplexes all requests (single TLS handshake);
+    # the transport also retries failed connection attempts
+    transport = httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=MAX_RETRIES,
+        limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+    )
+    async with httpx.AsyncClient(transport=transport, timeout=TIMEOUT) as client:
+        tasks = [_analyze(client, payload) for payload in ANALYSIS_REQUESTS]
+        for task in asyncio.as_completed(tasks):
+            payload, response, body = await task
+
+            print(f"\n{'='*80}")
+            print(f"ANALYZE: {payload['subcategory_id']} - {payload['subcategory_description']}")
+            print(f"{'='*80}")
+            if response is None:
+                print(body)
+                continue
+
+            print(f"Status: {response.status_code} ({response.http_version})")
+            if isinstance(body, str):
+                print(body)
+            else:
+                _dump(body)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
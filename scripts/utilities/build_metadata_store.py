@@ -13,7 +13,7 @@ from tqdm import tqdm
 
 # Add utilities to path
 sys.path.insert(0, str(Path(__file__).parent))
-from metadata_store import MetadataStore
+from metadata_store import MetadataStore, save_to_sqlite
 
 
 def build_from_processed_chunks(chunks_dir: str = "processed_chunks") -> MetadataStore:
@@ -233,7 +233,7 @@ def build_from_embeddings_gcs(gcs_path: str) -> MetadataStore:
 
 
 def save_metadata_store(metadata_store, output_file: str = "metadata_store_production.pkl"):
-    """Save metadata store to pickle file.
+    """Save metadata store to pickle file, or to SQLite if output_file ends with .db.
     
     Args:
         metadata_store: MetadataStore instance or dict
@@ -246,8 +246,11 @@ def save_metadata_store(metadata_store, output_file: str = "metadata_store_produ
         data = metadata_store
     
     print(f"\nSaving metadata store to: {output_file}")
-    with open(output_file, 'wb') as f:
-        pickle.dump(data, f)
+    if output_file.endswith('.db'):
+        save_to_sqlite(data, output_file)
+    else:
+        with open(output_file, 'wb') as f:
+            pickle.dump(data, f)
     
     print(f"✅ Saved {len(data):,} entries")
     
@@ -287,6 +290,9 @@ Examples:
   
   # Custom output file
   python build_metadata_store.py --from-chunks gs://bof-hackathon-data-eu/processed_chunks --output metadata_prod.pkl
+  
+  # SQLite output (read on demand, no full load at startup)
+  python build_metadata_store.py --from-chunks gs://bof-hackathon-data-eu/processed_chunks --output metadata_store_production.db
         """
     )
     
@@ -306,7 +312,7 @@ Examples:
         '--output',
         type=str,
         default='metadata_store_production.pkl',
-        help='Output pickle file path'
+        help='Output file path (.pkl for pickle, .db for SQLite)'
     )
     
     args = parser.parse_args()
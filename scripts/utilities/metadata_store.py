@@ -6,6 +6,7 @@ Loads metadata from processed chunks or test embeddings
 
 import json
 import os
+import sqlite3
 from typing import Dict, Optional, List
 from pathlib import Path
 
@@ -215,6 +216,85 @@ class MetadataStore:
         return len(self.metadata)
 
 
+class SQLiteMetadataStore:
+    """Read-only metadata store backed by a SQLite file.
+    
+    Rows are decoded on demand instead of unpickling the whole store, so opening
+    is near-instant and the memory-mapped pages are shared between processes
+    through the OS page cache.
+    """
+    
+    def __init__(self, db_path: str, mmap_size: int = 1 << 30):
+        """Open the metadata database.
+        
+        Args:
+            db_path: Path to SQLite file written by save_to_sqlite()
+            mmap_size: Maximum number of bytes SQLite may memory-map
+        """
+        self.db_path = db_path
+        uri = Path(db_path).resolve().as_uri() + "?mode=ro"
+        self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+        self._count = None
+    
+    def get(self, chunk_id: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        """Get metadata for a chunk ID."""
+        row = self.conn.execute(
+            "SELECT metadata_json FROM metadata WHERE id = ?", (chunk_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+    
+    def __contains__(self, chunk_id: str) -> bool:
+        return self.conn.execute(
+            "SELECT 1 FROM metadata WHERE id = ?", (chunk_id,)
+        ).fetchone() is not None
+    
+    def __len__(self):
+        if self._count is None:
+            # Row count recorded by save_to_sqlite(); COUNT(*) on the WITHOUT ROWID
+            # table would read every JSON payload in the file
+            try:
+                row = self.conn.execute(
+                    "SELECT value FROM store_info WHERE key = 'count'"
+                ).fetchone()
+            except sqlite3.OperationalError:
+                row = None  # Older file without store_info
+            if row is None:
+                row = self.conn.execute("SELECT COUNT(*) FROM metadata").fetchone()
+            self._count = int(row[0])
+        return self._count
+    
+    def __bool__(self):
+        return self.conn.execute("SELECT 1 FROM metadata LIMIT 1").fetchone() is not None
+
+
+def save_to_sqlite(metadata: Dict[str, Dict], db_path: str):
+    """Write a metadata dict to a SQLite file readable by SQLiteMetadataStore.
+    
+    Args:
+        metadata: Dict mapping chunk ID to metadata
+        db_path: Output SQLite file path (replaced if it exists)
+    """
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE metadata (
+            id TEXT PRIMARY KEY,
+            metadata_json TEXT NOT NULL
+        ) WITHOUT ROWID
+    """)
+    conn.executemany(
+        "INSERT INTO metadata (id, metadata_json) VALUES (?, ?)",
+        ((chunk_id, json.dumps(meta, separators=(',', ':'))) for chunk_id, meta in metadata.items())
+    )
+    conn.execute("CREATE TABLE store_info (key TEXT PRIMARY KEY, value) WITHOUT ROWID")
+    conn.execute("INSERT INTO store_info (key, value) VALUES ('count', ?)", (len(metadata),))
+    conn.commit()
+    conn.close()
+
+
 # Global instance for easy import
 _global_store = None
 
@@ -7,12 +7,18 @@ print("hello you mother fucker")
 from google.cloud import aiplatform
 from vertexai.language_models import TextEmbeddingModel
 import vertexai
-from vertexai.generative_models import GenerativeModel
-from typing import List, Dict, Optional
+from vertexai.generative_models import GenerativeModel, GenerationConfig
+from typing import List, Dict, Optional, Union
 import json
+import numpy as np
 import argparse
+import os
+import pickle
+import tempfile
 import time
+from pathlib import Path
 from google.api_core import exceptions as gcp_exceptions
+from metadata_store import SQLiteMetadataStore
 
 # Configuration
 PROJECT_ID = "428461461446"
@@ -21,6 +27,246 @@ LOCATION = "europe-west1"
 INDEX_ENDPOINT_NAME = "projects/428461461446/locations/europe-west1/indexEndpoints/7728040621125926912"
 DEPLOYED_INDEX_ID = "eu_legislation_prod_75480320"
 
+# Response schema for the formatting step of the LLM analysis
+OVERLAPS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "overlaps": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "regulation1": {"type": "string"},
+                    "regulation2": {"type": "string"},
+                    "description": {"type": "string"},
+                },
+                "required": ["regulation1", "regulation2", "description"],
+            },
+        },
+    },
+    "required": ["overlaps"],
+}
+
+# Response schema for query expansion
+VARIATIONS_SCHEMA = {
+    "type": "array",
+    "items": {"type": "string"},
+}
+
+# Loaded metadata stores, keyed by absolute path as (mtime_ns, store), shared
+# by all EULegislationRAG instances in this process
+_METADATA_CACHE: Dict[str, tuple] = {}
+
+
+# Resolved index endpoints shared by all EULegislationRAG instances in this process
+_ENDPOINT_CACHE: Dict[str, aiplatform.MatchingEngineIndexEndpoint] = {}
+
+
+def _get_index_endpoint(index_endpoint_name: str) -> aiplatform.MatchingEngineIndexEndpoint:
+    """Resolve an index endpoint, reusing an already resolved one.
+    
+    Args:
+        index_endpoint_name: Full resource name of the index endpoint
+        
+    Returns:
+        MatchingEngineIndexEndpoint instance
+    """
+    if index_endpoint_name not in _ENDPOINT_CACHE:
+        _ENDPOINT_CACHE[index_endpoint_name] = aiplatform.MatchingEngineIndexEndpoint(index_endpoint_name)
+    return _ENDPOINT_CACHE[index_endpoint_name]
+
+
+# Persistent cache of LLM query expansions, shared across runs
+EXPANSION_CACHE_PATH = Path(os.getenv("RAG_EXPANSION_CACHE", "~/.cache/rag_query_expansions.json")).expanduser()
+# Part of every cache key - bump when the expansion prompt or output format
+# changes so entries produced by the old one are no longer served
+EXPANSION_CACHE_VERSION = 2
+_expansion_cache = None
+
+
+def _expansion_cache_key(query: str, num_variations: int) -> str:
+    """Build the expansion cache key for a query."""
+    return f"v{EXPANSION_CACHE_VERSION}|{num_variations}|{query}"
+
+
+def _read_expansion_cache_file() -> Dict[str, List[str]]:
+    """Read the query expansion cache file (empty if missing or unreadable)."""
+    try:
+        with open(EXPANSION_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def _load_expansion_cache() -> Dict[str, List[str]]:
+    """Load the query expansion cache from disk on first use.
+    
+    Returns:
+        Dict mapping _expansion_cache_key() to generated variations
+    """
+    global _expansion_cache
+    if _expansion_cache is None:
+        _expansion_cache = _read_expansion_cache_file()
+    return _expansion_cache
+
+
+def _save_expansion_cache(key: str, variations: List[str]):
+    """Add an entry and atomically write the query expansion cache to disk.
+    
+    The file is re-read and merged first so entries written by other processes
+    since it was loaded are kept, and each writer uses its own temp file.
+    Entries from older cache versions are dropped.
+    
+    Args:
+        key: Key from _expansion_cache_key()
+        variations: Generated variations for that key
+    """
+    global _expansion_cache
+    cache = _read_expansion_cache_file()
+    cache.update(_load_expansion_cache())
+    cache[key] = variations
+    prefix = f"v{EXPANSION_CACHE_VERSION}|"
+    _expansion_cache = {k: v for k, v in cache.items() if k.startswith(prefix)}
+    
+    tmp_path = None
+    try:
+        EXPANSION_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=EXPANSION_CACHE_PATH.parent,
+                                         prefix=EXPANSION_CACHE_PATH.name + '.', suffix='.tmp',
+                                         delete=False) as f:
+            tmp_path = f.name
+            json.dump(_expansion_cache, f, ensure_ascii=False)
+        os.replace(tmp_path, EXPANSION_CACHE_PATH)
+    except OSError as e:
+        print(f"  Could not save query expansion cache: {e}")
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _load_metadata(metadata_file: str) -> Dict:
+    """Load the metadata store, reusing an already loaded copy if unchanged.
+    
+    Args:
+        metadata_file: Path to metadata pickle file, or SQLite file (.db)
+        
+    Returns:
+        Dict (or SQLiteMetadataStore) mapping chunk ID to metadata
+        (empty if the file is missing)
+    """
+    if not os.path.exists(metadata_file):
+        print(f"  ERROR: {metadata_file} not found!")
+        print(f"  Run: python build_metadata_store.py to create {metadata_file}")
+        return {}
+    
+    cache_key = os.path.abspath(metadata_file)
+    mtime_ns = os.stat(metadata_file).st_mtime_ns
+    cached = _METADATA_CACHE.get(cache_key)
+    if cached and cached[0] == mtime_ns:
+        print(f"  Using already loaded metadata from {metadata_file}")
+        return cached[1]
+    
+    if metadata_file.endswith('.db'):
+        print(f"  Opening SQLite metadata store {metadata_file}...")
+        metadata = SQLiteMetadataStore(metadata_file)
+    else:
+        print(f"  Loading production metadata from {metadata_file}...")
+        with open(metadata_file, 'rb') as f:
+            metadata = pickle.load(f)
+    
+    # Replaces (and releases) any copy loaded before the file was rebuilt
+    _METADATA_CACHE[cache_key] = (mtime_ns, metadata)
+    return metadata
+
+
+def _top_k_ids(scores: Dict[str, float], k: int) -> List[str]:
+    """Select the IDs of the k highest scores, best first.
+    
+    Uses a partial partition so only the k survivors get fully sorted. Ties
+    keep insertion order, matching sorted(..., reverse=True).
+    
+    Args:
+        scores: Dict mapping ID to score (higher is better)
+        k: Number of IDs to return
+        
+    Returns:
+        List of at most k IDs ordered by descending score
+    """
+    ids = list(scores)
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(ids))
+    
+    if k < len(ids):
+        # A partition alone picks arbitrarily among values tied at the cutoff, so
+        # take everything above it plus the earliest-inserted ties, in index order
+        kth = -np.partition(-values, k - 1)[k - 1]
+        above = np.flatnonzero(values > kth)
+        ties = np.flatnonzero(values == kth)[:k - len(above)]
+        top = np.concatenate((above, ties))
+        top.sort()
+    else:
+        top = np.arange(len(ids))
+    # Stable sort on index-ordered survivors keeps insertion order among ties
+    top = top[np.argsort(-values[top], kind='stable')]
+    
+    return [ids[i] for i in top]
+
+
+def _rescore_exact(neighbors: List, query_embedding: List[float]) -> List[tuple]:
+    """Re-rank ANN neighbors by their exact dot product with the query.
+    
+    The vectors come back with the search results (return_full_datapoint), so
+    this is a single float32 matrix-vector product over the candidates.
+    
+    Args:
+        neighbors: MatchNeighbor results including feature vectors
+        query_embedding: Query embedding values
+        
+    Returns:
+        List of (neighbor, score) tuples ordered by descending exact score,
+        or by ANN distance if any neighbor has no feature vector
+    """
+    if not neighbors or not all(n.feature_vector for n in neighbors):
+        return [(n, float(n.distance)) for n in neighbors]
+    
+    candidates = np.asarray([n.feature_vector for n in neighbors], dtype=np.float32)
+    scores = candidates @ np.asarray(query_embedding, dtype=np.float32)
+    order = np.argsort(-scores, kind='stable')
+    
+    return [(neighbors[i], float(scores[i])) for i in order]
+
+
+def _recover_overlaps(text: str) -> List[Dict]:
+    """Recover the complete overlap items from cut-off JSON output.
+    
+    Output that hits max_output_tokens stops mid-item, which makes the whole
+    document invalid JSON even though every item before the cut is well formed.
+    
+    Args:
+        text: Truncated JSON text of an OVERLAPS_SCHEMA object
+        
+    Returns:
+        List of the overlap dicts that were fully written (may be empty)
+    """
+    key = text.find('"overlaps"')
+    start = text.find('[', key) if key != -1 else -1
+    if start == -1:
+        return []
+    
+    decoder = json.JSONDecoder()
+    items = []
+    pos = start + 1
+    while True:
+        # Skip whitespace and the comma between items
+        while pos < len(text) and text[pos] in ' \t\r\n,':
+            pos += 1
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break  # Closing bracket, or the item that was cut off
+        if isinstance(item, dict):
+            items.append(item)
+    
+    return items
+
 
 class EULegislationRAG:
     """RAG system for EU legislation semantic search and analysis."""
@@ -57,7 +303,7 @@ class EULegislationRAG:
             location: GCP region
             index_endpoint_name: Full resource name of the index endpoint
             deployed_index_id: ID of the deployed index
-            metadata_file: Path to metadata pickle file
+            metadata_file: Path to metadata pickle file, or SQLite file (.db)
         """
         aiplatform.init(project=project_id, location=location)
         # Initialize vertexai with us-central1 for Gemini models
@@ -83,21 +329,11 @@ class EULegislationRAG:
         if not self.chat_model:
             print("  WARNING: No Gemini model available, LLM analysis will be skipped")
         
-        self.index_endpoint = aiplatform.MatchingEngineIndexEndpoint(index_endpoint_name)
+        self.index_endpoint = _get_index_endpoint(index_endpoint_name)
         self.deployed_index_id = deployed_index_id
         
         # Initialize metadata store - load production metadata from pickle
-        import pickle
-        import os
-        
-        if os.path.exists(metadata_file):
-            print(f"  Loading production metadata from {metadata_file}...")
-            with open(metadata_file, 'rb') as f:
-                self.metadata_store = pickle.load(f)
-        else:
-            print(f"  ERROR: {metadata_file} not found!")
-            print(f"  Run: python build_metadata_store.py to create {metadata_file}")
-            self.metadata_store = {}
+        self.metadata_store = _load_metadata(metadata_file)
         
         print(f"Initialized EULegislationRAG")
         print(f"  Project: {project_id}")
@@ -139,21 +375,39 @@ class EULegislationRAG:
         Returns:
             List of query variations
         """
-        prompt = f"""Generate {num_variations} alternative phrasings of the following search query for EU legislation.
+        cache_key = _expansion_cache_key(query, num_variations)
+        cache = _load_expansion_cache()
+        if cache_key in cache:
+            print("  Using cached query variations")
+            return cache[cache_key]
+        
+        # Fixed instructions first, variable query last (shared cacheable prefix)
+        prompt = f"""Generate alternative phrasings of the following search query for EU legislation.
 Keep the core intent but vary the wording, terminology, and perspective.
 Focus on regulatory and legal terminology variations.
+Return ONLY a JSON array of strings, one alternative query per element.
 
-Original query: {query}
+Number of alternatives: {num_variations}
 
-Provide ONLY the alternative queries, one per line, without numbering or explanation."""
+Original query: {query}"""
         
         try:
-            response = self.chat_model.generate_content(prompt)
-            variations = [line.strip() for line in response.text.strip().split('\n') if line.strip()]
-            return variations[:num_variations]
+            response = self.chat_model.generate_content(
+                prompt,
+                generation_config=GenerationConfig(
+                    response_mime_type="application/json",
+                    response_schema=VARIATIONS_SCHEMA,
+                )
+            )
+            variations = [v.strip() for v in json.loads(response.text) if isinstance(v, str) and v.strip()]
+            variations = variations[:num_variations]
         except Exception as e:
             print(f"  Query expansion failed: {e}")
             return []
+        
+        if variations:
+            _save_expansion_cache(cache_key, variations)
+        return variations
     
     def query(self, 
               user_query: str, 
@@ -162,7 +416,8 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
               top_k: int = 50,
               analyze_with_llm: bool = True,
               focus_cross_regulation: bool = True,
-              use_query_expansion: bool = True) -> Dict:
+              use_query_expansion: bool = True,
+              exact_rescore: bool = False) -> Dict:
         """Execute a search query and optionally analyze results with LLM.
         
         Args:
@@ -173,6 +428,7 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
             analyze_with_llm: Whether to analyze results with Gemini
             focus_cross_regulation: If True, only report contradictions/overlaps between different regulations, not within same regulation
             use_query_expansion: If True, generate query variations for better recall
+            exact_rescore: If True, oversample ANN candidates and re-rank them by exact dot product
         
         Returns:
             Dict with search results and optional LLM analysis
@@ -194,63 +450,63 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
         query_embeddings = [emb.values for emb in self._get_embeddings_with_retry(queries_to_search)]
         
         # Step 3: Vector search for all query variations
-        all_results = {}
-        for i, query_embedding in enumerate(query_embeddings):
-            search_results = self.index_endpoint.find_neighbors(
-                deployed_index_id=self.deployed_index_id,
-                queries=[query_embedding],
-                num_neighbors=top_k if not use_query_expansion else 30
-            )
+        # Scores are accumulated in flat dicts keyed by neighbor ID in a single
+        # pass: best distance for plain ranking, running RRF sum for fusion.
+        use_rrf = use_query_expansion and len(queries_to_search) > 1
+        best_scores = {}
+        rrf_scores = {}
+        num_neighbors = top_k if not use_query_expansion else 30
+        if exact_rescore:
+            # Oversample so exact rescoring can promote candidates ANN ranked lower
+            num_neighbors *= 3
+        
+        # One batched search call for the original query and all its variations
+        search_results = self.index_endpoint.find_neighbors(
+            deployed_index_id=self.deployed_index_id,
+            queries=query_embeddings,
+            num_neighbors=num_neighbors,
+            return_full_datapoint=exact_rescore
+        )
+        
+        for query_embedding, neighbors in zip(query_embeddings, search_results):
+            if exact_rescore:
+                ranked = _rescore_exact(neighbors, query_embedding)
+            else:
+                ranked = [(n, float(n.distance)) for n in neighbors]
             
             # Collect results with their rank
-            for rank, neighbor in enumerate(search_results[0]):
-                if neighbor.id not in all_results:
-                    all_results[neighbor.id] = {
-                        'neighbor': neighbor,
-                        'ranks': [],
-                        'best_score': float(neighbor.distance)
-                    }
-                all_results[neighbor.id]['ranks'].append(rank + 1)
-                all_results[neighbor.id]['best_score'] = max(
-                    all_results[neighbor.id]['best_score'],
-                    float(neighbor.distance)
-                )
+            for rank, (neighbor, distance) in enumerate(ranked, 1):
+                neighbor_id = neighbor.id
+                if neighbor_id not in best_scores:
+                    best_scores[neighbor_id] = distance
+                    rrf_scores[neighbor_id] = 0.0
+                elif distance > best_scores[neighbor_id]:
+                    best_scores[neighbor_id] = distance
+                # RRF score: sum of 1/(k + rank) for each appearance
+                rrf_scores[neighbor_id] += 1.0 / (60 + rank)
         
-        # Apply Reciprocal Rank Fusion (RRF) if using query expansion
-        if use_query_expansion and len(queries_to_search) > 1:
+        # Apply Reciprocal Rank Fusion (RRF) if using query expansion,
+        # otherwise rank by distance score (higher is better for dot product)
+        if use_rrf:
             print(f"Fusing results from {len(queries_to_search)} queries using RRF...")
-            for result_id, result_data in all_results.items():
-                # RRF score: sum of 1/(k + rank) for each appearance
-                rrf_score = sum(1.0 / (60 + rank) for rank in result_data['ranks'])
-                result_data['rrf_score'] = rrf_score
-            
-            # Sort by RRF score (higher is better)
-            sorted_ids = sorted(all_results.keys(), 
-                              key=lambda x: all_results[x]['rrf_score'], 
-                              reverse=True)[:top_k]
+            scores = rrf_scores
         else:
-            # Sort by distance score (higher is better for dot product)
-            sorted_ids = sorted(all_results.keys(), 
-                              key=lambda x: all_results[x]['best_score'], 
-                              reverse=True)[:top_k]
+            scores = best_scores
         
-        # Reconstruct neighbor-like results from sorted IDs
-        print(f"Retrieved {len(all_results)} unique results, using top {len(sorted_ids)}...")
+        sorted_ids = _top_k_ids(scores, top_k)
         
-        # Extract neighbor IDs and fetch metadata from store
-        neighbor_ids = sorted_ids
+        print(f"Retrieved {len(scores)} unique results, using top {len(sorted_ids)}...")
         
-        # Process results with metadata
+        # Process results with metadata - only the selected IDs are materialized
         chunks = []
-        for neighbor_id in neighbor_ids:
-            result_data = all_results[neighbor_id]
-            neighbor = result_data['neighbor']
-            
+        for neighbor_id in sorted_ids:
             # Get metadata from dictionary
-            metadata = self.metadata_store.get(neighbor_id, {
-                'id': neighbor_id,
-                'full_text': 'Metadata not available'
-            })
+            metadata = self.metadata_store.get(neighbor_id)
+            if metadata is None:
+                metadata = {
+                    'id': neighbor_id,
+                    'full_text': 'Metadata not available'
+                }
             
             # Apply filters
             if year_filter and metadata.get('year', 0) and metadata['year'] < year_filter:
@@ -259,11 +515,8 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
             if risk_category and not self._matches_risk_category(metadata, risk_category):
                 continue
             
-            # Use RRF score if available, otherwise use distance
-            score = result_data.get('rrf_score', float(neighbor.distance))
-            
             chunks.append({
-                'score': score,
+                'score': scores[neighbor_id],
                 'id': neighbor_id,
                 'metadata': metadata
             })
@@ -310,7 +563,7 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
         
         return any(kw.lower() in text or kw.lower() in reg_name for kw in keywords)
     
-    def _analyze_with_llm(self, query: str, chunks: List[Dict], focus_cross_regulation: bool = True) -> str:
+    def _analyze_with_llm(self, query: str, chunks: List[Dict], focus_cross_regulation: bool = True) -> Union[Dict, str]:
         """Use Gemini to analyze retrieved chunks for overlaps and contradictions.
         
         Args:
@@ -319,7 +572,7 @@ Provide ONLY the alternative queries, one per line, without numbering or explana
             focus_cross_regulation: If True, only analyze contradictions/overlaps between different regulations
             
         Returns:
-            str: LLM analysis
+            Dict with an 'overlaps' list, or str if the output could not be parsed
         """
         # Build context from chunks
         context = self._format_chunks_for_llm(chunks)
@@ -337,15 +590,13 @@ Only flag issues where provisions from DIFFERENT regulations conflict or overlap
             overlap_instruction = "Find overlapping regulatory scope or requirements"
         
         # STEP 1: Analysis prompt - let Gemini analyze freely without format constraints
+        # Static instructions come first and the per-request query/context last, so
+        # every analysis call shares an identical prompt prefix the model's
+        # context cache can reuse instead of re-processing it.
         analysis_prompt = f"""You are a regulatory compliance analyst. Analyze these EU regulations for overlaps and contradictions.
 
 {analysis_scope}
 
-USER QUERY: {query}
-
-REGULATIONS:
-{context}
-
 TASK:
 - {overlap_instruction}
 - Find at least 3-5 overlaps (including contradictions, complementary requirements, or overlapping scope)
@@ -353,7 +604,12 @@ TASK:
 - Explain each finding clearly
 - Treat contradictions as a type of overlap
 
-Write your analysis naturally. Focus on finding the relationships, not on formatting."""
+Write your analysis naturally. Focus on finding the relationships, not on formatting.
+
+USER QUERY: {query}
+
+REGULATIONS:
+{context}"""
 
         try:
             # First call: Get free-form analysis
@@ -385,43 +641,38 @@ Write your analysis naturally. Focus on finding the relationships, not on format
             print("="*100)
             print("\nSending formatting prompt to AI...")
             
-            format_prompt = f"""Your job is to reformat text into a specific structure for computer parsing.
+            # Fixed format spec first, variable input text last (shared cacheable prefix)
+            format_prompt = f"""Your job is to extract structured data from text for computer parsing.
 
-INPUT TEXT:
-{raw_analysis}
+YOUR TASK: Extract the overlaps and contradictions from the input text and return them as JSON.
 
-YOUR TASK: Extract the overlaps and contradictions from the input text and format them EXACTLY as shown below.
+Each overlap has:
+- regulation1: First regulation and article, e.g. Regulation (EU) No 575/2013 Article 4
+- regulation2: Second regulation and article, e.g. Directive 2013/36/EU Article 98
+- description: Brief six sentence description of the overlap
 
-REQUIRED OUTPUT FORMAT (copy this structure exactly):
+CRITICAL RULES:
+1. Do NOT include a summary, recommendations, or any other sections
+2. Remove ALL bold formatting (remove ** symbols)
+3. Remove ALL quotation marks
+4. Include contradictions as overlaps
+5. Must have at least 3 overlaps
 
-OVERLAPS
-1. Regulation (EU) No 575/2013 Article 4 vs Regulation (EU) 2019/876 Article 2 - Brief six sentence description of the overlap.
-2. Directive 2013/36/EU Article 98 vs Regulation (EU) No 575/2013 Article 376 - Brief six sentence description of the overlap.
-3. Regulation (EU) No 575/2013 Article 395 vs Directive 2013/36/EU Article 81 - Brief six sentence description of the overlap.
-4. Regulation (EU) No 575/2013 Article 124 vs Directive 2013/36/EU Article 73 - Brief six sentence description of the overlap.
-5. Regulation (EU) 2019/876 Article 10 vs Directive 2013/36/EU Article 45 - Brief six sentence description of the overlap.
+INPUT TEXT:
+{raw_analysis}"""
 
-CRITICAL RULES:
-1. Your output MUST start with the word "OVERLAPS" on the first line
-2. Do NOT include a summary, recommendations, or any other sections
-3. Each numbered item MUST be on ONE single line (no line breaks within an item)
-4. Format for each item: NUMBER. Regulation Name Article X vs Regulation Name Article Y - Description.
-5. Remove ALL bold formatting (remove ** symbols)
-6. Remove ALL quotation marks
-7. Include contradictions as overlaps
-8. Must have at least 3 overlaps
-
-Your first word must be "OVERLAPS". Start now:"""
-
-            # Second call: Get formatted version with strict generation config
+            # Second call: constrain decoding to the overlaps schema so the output
+            # can be loaded directly instead of being scraped line by line
             reformat_response = self.chat_model.generate_content(
                 format_prompt,
-                generation_config={
-                    "temperature": 0,  # Deterministic output
-                    "top_p": 0.95,
-                    "top_k": 20,
-                    "max_output_tokens": 4096,  # Increased for longer outputs
-                }
+                generation_config=GenerationConfig(
+                    temperature=0,  # Deterministic output
+                    top_p=0.95,
+                    top_k=20,
+                    max_output_tokens=4096,  # Increased for longer outputs
+                    response_mime_type="application/json",
+                    response_schema=OVERLAPS_SCHEMA,
+                )
             )
             
             # Check if response was truncated
@@ -455,7 +706,12 @@ Your first word must be "OVERLAPS". Start now:"""
             print(f"Ends with: ...{formatted[-100:] if len(formatted) > 100 else formatted}")
             print(f"{'='*100}\n")
             
-            return formatted
+            analysis = self._parse_json_analysis(formatted)
+            if analysis is None:
+                print("⚠️  WARNING: Formatted output is not valid JSON, returning raw text")
+                return formatted
+            
+            return analysis
             
         except Exception as e:
             print(f"\n{'='*100}")
@@ -465,6 +721,38 @@ Your first word must be "OVERLAPS". Start now:"""
             print(f"{'='*100}\n")
             return f"LLM analysis failed: {str(e)}"
     
+    @staticmethod
+    def _parse_json_analysis(text: str) -> Optional[Dict]:
+        """Load schema-constrained LLM output, tolerating markdown code fences.
+        
+        Args:
+            text: LLM output text
+            
+        Returns:
+            Dict with an 'overlaps' list, or None if not even one complete
+            overlap could be read
+        """
+        text = text.strip()
+        if text.startswith("```"):
+            text = text.strip("`")
+            if text.startswith("json"):
+                text = text[4:]
+        
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            overlaps = _recover_overlaps(text)
+            if not overlaps:
+                return None
+            print(f"⚠️  WARNING: Output was cut off, recovered {len(overlaps)} complete overlaps")
+            return {'overlaps': overlaps}
+        
+        if not isinstance(data, dict) or not isinstance(data.get('overlaps'), list):
+            return None
+        
+        data['overlaps'] = [item for item in data['overlaps'] if isinstance(item, dict)]
+        return data
+    
     def _format_chunks_for_llm(self, chunks: List[Dict]) -> str:
         """Format chunks with citations for LLM context.
         
@@ -509,6 +797,18 @@ Similarity: {chunk['score']:.3f}
     def print_results(self, result: Dict):
         """Print formatted search results.
         
+        Args:
+            result: Query result dictionary
+        """
+        self._print_chunks(result)
+        
+        # Searches run with analyze_with_llm=False skip the analysis formatting entirely
+        if result['llm_analysis']:
+            self._print_analysis(result['llm_analysis'])
+    
+    def _print_chunks(self, result: Dict):
+        """Print the query summary and top matching chunks.
+        
         Args:
             result: Query result dictionary
         """
@@ -532,12 +832,22 @@ Similarity: {chunk['score']:.3f}
             print(f"   Article: {meta.get('article_number', 'N/A')} | Year: {meta.get('year', 'N/A')}")
             print(f"   Score: {chunk['score']:.3f}")
             print(f"   Text: {meta.get('full_text', '')[:150]}...")
+    
+    def _print_analysis(self, analysis: Union[Dict, str]):
+        """Print the LLM analysis.
         
-        if result['llm_analysis']:
-            print(f"\n{'='*80}")
-            print(f"LLM ANALYSIS")
-            print(f"{'='*80}")
-            print(result['llm_analysis'])
+        Args:
+            analysis: Structured analysis dict, or raw text if it could not be parsed
+        """
+        print(f"\n{'='*80}")
+        print(f"LLM ANALYSIS")
+        print(f"{'='*80}")
+        if isinstance(analysis, dict):
+            for i, overlap in enumerate(analysis['overlaps'], 1):
+                print(f"{i}. {overlap.get('regulation1', '')} vs {overlap.get('regulation2', '')} - "
+                      f"{overlap.get('description', '')}")
+        else:
+            print(analysis)
 
 
 def main():
@@ -607,11 +917,16 @@ def main():
         action='store_true',
         help='Disable query expansion (faster but lower recall)'
     )
+    parser.add_argument(
+        '--exact-rescore',
+        action='store_true',
+        help='Re-rank oversampled ANN candidates by exact dot product (better ordering)'
+    )
     parser.add_argument(
         '--metadata-file',
         type=str,
         default='metadata_store_production.pkl',
-        help='Path to metadata pickle file (default: metadata_store_production.pkl)'
+        help='Path to metadata pickle or SQLite (.db) file (default: metadata_store_production.pkl)'
     )
     
     args = parser.parse_args()
@@ -633,7 +948,8 @@ def main():
         top_k=args.top_k,
         analyze_with_llm=not args.no_llm,
         focus_cross_regulation=not args.include_same_regulation,
-        use_query_expansion=not args.no_query_expansion
+        use_query_expansion=not args.no_query_expansion,
+        exact_rescore=args.exact_rescore
     )
     
     # Print results
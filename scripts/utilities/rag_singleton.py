@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Process-wide EULegislationRAG instance
+Lets the API server, test scripts and notebooks share one initialized RAG system
+instead of paying Vertex AI setup and metadata loading for each of them
+"""
+
+import os
+from functools import lru_cache
+from rag_search import (
+    EULegislationRAG,
+    PROJECT_ID,
+    LOCATION,
+    INDEX_ENDPOINT_NAME,
+    DEPLOYED_INDEX_ID,
+)
+
+
+def get_rag(project_id: str = PROJECT_ID,
+            location: str = LOCATION,
+            index_endpoint_name: str = INDEX_ENDPOINT_NAME,
+            deployed_index_id: str = DEPLOYED_INDEX_ID,
+            metadata_file: str = "metadata_store_production.pkl") -> EULegislationRAG:
+    """Get or create the RAG system for a configuration.
+
+    Instances are cached per configuration, so repeated calls with the same
+    configuration return the same instance however the arguments are passed.
+
+    Args:
+        project_id: GCP project ID
+        location: GCP region
+        index_endpoint_name: Full resource name of the index endpoint
+        deployed_index_id: ID of the deployed index
+        metadata_file: Path to metadata pickle or SQLite (.db) file
+
+    Returns:
+        EULegislationRAG instance
+    """
+    return _get_rag_cached(project_id, location, index_endpoint_name,
+                           deployed_index_id, os.path.abspath(metadata_file))
+
+
+@lru_cache(maxsize=4)
+def _get_rag_cached(project_id: str,
+                    location: str,
+                    index_endpoint_name: str,
+                    deployed_index_id: str,
+                    metadata_file: str) -> EULegislationRAG:
+    """Create the RAG system for a normalized, positional configuration."""
+    return EULegislationRAG(
+        project_id=project_id,
+        location=location,
+        index_endpoint_name=index_endpoint_name,
+        deployed_index_id=deployed_index_id,
+        metadata_file=metadata_file
+    )